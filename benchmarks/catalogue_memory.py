@@ -0,0 +1,145 @@
+# RSS/PSS of the ORM read path against the catalogue snapshot. Seeds a temporary
+# database, then measures each path in a fresh process. Run from the repository root:
+#
+#     python -m benchmarks.catalogue_memory --books 1000000
+#
+# Linux only: memory figures come from /proc/self/status and /proc/self/smaps_rollup.
+
+import argparse
+import gc
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from models.books import Book, CatalogueVersion
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory() -> str:
+    status = {}
+    for line in open("/proc/self/status"):
+        name, _, value = line.partition(":")
+        if name in ("VmRSS", "RssAnon", "RssFile"):
+            status[name] = int(value.split()[0]) // 1024
+    return f"rss {status['VmRSS']} MB (anon {status['RssAnon']}, file {status['RssFile']})"
+
+
+def pss() -> str:
+    for line in open("/proc/self/smaps_rollup"):
+        if line.startswith("Pss:"):
+            return f"pss {int(line.split()[1]) // 1024} MB"
+    return "pss n/a"
+
+
+def seed(directory: str, count: int) -> None:
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'library.db')}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(CatalogueVersion(id=1))
+        session.commit()
+    engine.dispose()
+
+    now = datetime.utcnow().isoformat(sep=" ")
+    rows = (
+        (i, f"Книга номер {i} Volume {i % 97}", f"Автор {i % 20000}", 1900 + i % 120, f"Жанр {i % 40}",
+         "Описание книги " * (3 + i % 28) if i % 4 else None, 1, 3, 3, now, now)
+        for i in range(1, count + 1)
+    )
+    connection = sqlite3.connect(os.path.join(directory, "library.db"))
+    connection.executemany(
+        "INSERT INTO book (id, title, author, year, genre, description, is_available, "
+        "copies_total, copies_available, created_at, updated_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        rows
+    )
+    connection.commit()
+    connection.close()
+
+
+def measure(mode: str, pages: int) -> None:
+    # runs in a fresh process whose working directory holds the seeded library.db
+    from database import catalogue
+    from database.connection import engine
+    from models.books import BookResponse
+
+    engine.echo = False
+    print(f"[{mode}] after import: {memory()}")
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        if mode == "snapshot":
+            catalogue.get_snapshot(session)
+            with catalogue._build_lock:
+                pass
+            catalogue.get_snapshot(session)
+        print(f"[{mode}] snapshot ready in {time.perf_counter() - started:.2f} s: {memory()}")
+
+        total = session.exec(select(func.max(Book.id))).one()
+        stride = max(total // pages, 1)
+
+        started = time.perf_counter()
+        for page in range(pages):
+            for book in catalogue.get_all_books(session, page * stride, 100):
+                BookResponse.model_validate(book, from_attributes=True)
+        elapsed = (time.perf_counter() - started) / pages * 1000
+        print(f"[{mode}] {pages} pages of 100: {elapsed:.2f} ms/page, {memory()}")
+
+        for terms in ({"genre": "Жанр 17"}, {"title": "volume 42"}):
+            started = time.perf_counter()
+            found = len(catalogue.search_books(session, **terms))
+            print(f"[{mode}] search {terms}: {found} rows in {time.perf_counter() - started:.2f} s, {memory()}")
+            session.expunge_all()
+            gc.collect()
+
+        print(f"[{mode}] after gc: {memory()}, {pss()}")
+
+    if mode == "snapshot":
+        pid = os.fork()
+        if pid == 0:
+            with Session(engine) as session:
+                catalogue.get_all_books(session, 0, 100)
+                catalogue.search_books(session, title="volume 42")
+            print(f"[{mode}] forked worker: {memory()}, {pss()}")
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--measure", choices=("orm", "snapshot"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.pages)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        seed(directory, args.books)
+        print(f"seeded {args.books} books in {time.perf_counter() - started:.1f} s")
+
+        for mode in ("orm", "snapshot"):
+            env = {
+                **os.environ,
+                "PYTHONPATH": ROOT,
+                "LIBRARY_CATALOGUE_SNAPSHOT": "1" if mode == "snapshot" else "0",
+                "LIBRARY_SNAPSHOT_DIR": os.path.join(directory, "catalogue"),
+            }
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.catalogue_memory",
+                 "--measure", mode, "--pages", str(args.pages)],
+                cwd=directory, env=env, check=True
+            )
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+# Bytes and latency of one /user/books page before and after compression and
+# sparse fieldsets. Run from the repository root:
+#
+#     python -m benchmarks.compression --books 2000 --page 100 --requests 50
+
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+
+from database.connection import get_session
+from middleware.compression import ENCODERS, CompressionMiddleware
+from models.books import Book
+from routes.user import router as user_router
+
+
+def seed(engine, count: int) -> None:
+    with Session(engine) as session:
+        session.add_all([
+            Book(
+                title=f"Книга {i}",
+                author=f"Автор {i % 50}",
+                year=1900 + i % 100,
+                genre=f"Жанр {i % 10}",
+                description=f"Описание книги {i} " * 40,
+                copies_total=3,
+                copies_available=3
+            )
+            for i in range(count)
+        ])
+        session.commit()
+
+
+def make_client(engine, compress: bool) -> TestClient:
+    def get_bench_session():
+        with Session(engine) as session:
+            yield session
+
+    app = FastAPI()
+    if compress:
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    app.include_router(user_router)
+    app.dependency_overrides[get_session] = get_bench_session
+
+    return TestClient(app)
+
+
+def measure(client: TestClient, params: dict, encoding: str, requests: int):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/user/books", params=params, headers={"Accept-Encoding": encoding})
+    elapsed = (time.perf_counter() - started) / requests * 1000
+
+    return int(response.headers["content-length"]), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+        seed(engine, args.books)
+
+        cases = [("before", False, {}, "identity")]
+        for fields in (None, "id,title,author"):
+            for encoding in ("identity", *ENCODERS):
+                params = {"fields": fields} if fields else {}
+                cases.append(("after", True, params, encoding))
+
+        print(f"{'':8}{'fields':18}{'encoding':10}{'bytes':>10}{'ms/page':>10}")
+        clients = {compress: make_client(engine, compress) for compress in (False, True)}
+        for label, compress, params, encoding in cases:
+            params = {"limit": args.page, **params}
+            size, elapsed = measure(clients[compress], params, encoding, args.requests)
+            print(f"{label:8}{params.get('fields', 'all'):18}{encoding:10}{size:>10}{elapsed:>10.2f}")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
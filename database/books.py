@@ -1,13 +1,56 @@
 from sqlmodel import Session, select
+from sqlalchemy import select as select_columns, update
+from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 from datetime import datetime
-from models.books import Book, BookCreate, BookUpdate, User, UserBook, UserBookCreate, UserBookUpdate
+from models.books import (
+    Book, BookCreate, BookUpdate, CatalogueVersion, Hold, Loan, User, UserBook, UserBookCreate, UserBookUpdate
+)
+
+# columns a client may request with ?fields=...; mirrors BookResponse
+BOOK_FIELDS = (
+    "id", "title", "author", "year", "genre", "description",
+    "copies_total", "copies_available", "is_available", "created_at"
+)
+
+
+class BookInUseError(Exception):
+    pass
+
+
+def parse_book_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in BOOK_FIELDS]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+
+    return names or None
+
+
+def _book_columns(fields: List[str]) -> list:
+    return [getattr(Book, name).label(name) for name in fields]
+
+
+def _bump_catalogue_version(session: Session) -> None:
+    # read-side caches (database.catalogue) rebuild when this number changes
+    session.exec(update(CatalogueVersion).values(version=CatalogueVersion.version + 1))
+
+
+def get_catalogue_version(session: Session) -> int:
+    statement = select(CatalogueVersion.version).where(CatalogueVersion.id == 1)
+    return session.exec(statement).first() or 0
 
 
 def create_book(session: Session, book_create: BookCreate) -> Book:
     book = Book(**book_create.dict())
+    book.copies_available = book.copies_total
+    book.is_available = book.copies_available > 0
 
     session.add(book)
+    _bump_catalogue_version(session)
     session.commit()
     session.refresh(book)
 
@@ -18,7 +61,13 @@ def get_book_by_id(session: Session, book_id: int) -> Optional[Book]:
     return session.get(Book, book_id)
 
 
-def get_all_books(session: Session, skip: int = 0, limit: int = 100) -> List[Book]:
+def get_all_books(session: Session, skip: int = 0, limit: int = 100,
+                  fields: Optional[List[str]] = None) -> List[Book]:
+    if fields:
+        # only the requested columns are selected; rows come back as plain dicts
+        statement = select_columns(*_book_columns(fields)).offset(skip).limit(limit)
+        return [dict(row) for row in session.exec(statement).mappings()]
+
     statement = select(Book).offset(skip).limit(limit)
     return session.exec(statement).all()
 
@@ -28,14 +77,21 @@ def update_book(session: Session, book_id: int, book_update: BookUpdate) -> Opti
     if not book:
         return None
 
-    update_data = book_update.dict(exclude_unset=True)
+    # copies are resized through database.lending so the availability counter stays consistent
+    update_data = book_update.dict(exclude_unset=True, exclude={"copies_total"})
+    changes = {key: value for key, value in update_data.items() if getattr(book, key) != value}
 
-    for key, value in update_data.items():
+    # nothing the catalogue snapshot stores changed (e.g. only copies were resized)
+    if not changes:
+        return book
+
+    for key, value in changes.items():
         setattr(book, key, value)
 
     book.updated_at = datetime.utcnow()
 
     session.add(book)
+    _bump_catalogue_version(session)
     session.commit()
     session.refresh(book)
 
@@ -48,14 +104,25 @@ def delete_book(session: Session, book_id: int) -> bool:
         return False
 
     session.delete(book)
+    _bump_catalogue_version(session)
+
+    # checked after the delete is flushed, so a concurrent checkout either committed
+    # before it (and is seen here) or finds no book to take a copy from
+    active_loan = select(Loan.id).where((Loan.book_id == book_id) & (Loan.returned_at == None))
+    pending_hold = select(Hold.id).where((Hold.book_id == book_id) & (Hold.fulfilled_at == None))
+    if session.exec(active_loan).first() or session.exec(pending_hold).first():
+        session.rollback()
+        raise BookInUseError(f"Книга с ID {book_id} выдана или забронирована, удаление невозможно")
+
     session.commit()
 
     return True
 
 
 def search_books(session: Session, title: Optional[str] = None,
-                 author: Optional[str] = None, genre: Optional[str] = None) -> List[Book]:
-    statement = select(Book)
+                 author: Optional[str] = None, genre: Optional[str] = None,
+                 fields: Optional[List[str]] = None) -> List[Book]:
+    statement = select_columns(*_book_columns(fields)) if fields else select(Book)
 
     if title:
         statement = statement.where(Book.title.ilike(f"%{title}%"))
@@ -64,6 +131,9 @@ def search_books(session: Session, title: Optional[str] = None,
     if genre:
         statement = statement.where(Book.genre.ilike(f"%{genre}%"))
 
+    if fields:
+        return [dict(row) for row in session.exec(statement).mappings()]
+
     return session.exec(statement).all()
 
 
@@ -74,7 +144,12 @@ def get_or_create_user(session: Session, username: str) -> User:
     if not user:
         user = User(username=username)
         session.add(user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            # created concurrently by another request
+            session.rollback()
+            return session.exec(statement).one()
         session.refresh(user)
 
     return user
@@ -193,31 +268,30 @@ def get_user_unread_books(session: Session, username: str) -> List[UserBook]:
     return session.exec(statement).all()
 
 
-def get_user_library_with_details(session: Session, username: str) -> List[dict]:
-    user_books = get_user_library(session, username)
+def get_user_library_with_details(session: Session, username: str,
+                                  fields: Optional[List[str]] = None) -> List[dict]:
+    user = get_user_by_username(session, username)
+    if not user:
+        return []
+
+    book_fields = fields or list(BOOK_FIELDS)
+
+    # one joined query instead of a lookup per entry, loading only the book columns asked for
+    statement = select_columns(UserBook, *_book_columns(book_fields)).join(
+        Book, Book.id == UserBook.book_id
+    ).where(UserBook.user_id == user.id)
 
     result = []
-    for user_book in user_books:
-        book = get_book_by_id(session, user_book.book_id)
-        if book:
-            user_data = {
-                "id": user_book.id,
-                "book_id": user_book.book_id,
-                "is_read": user_book.is_read,
-                "rating": user_book.rating,
-                "notes": user_book.notes,
-                "added_at": user_book.added_at,
-                "book": {
-                    "id": book.id,
-                    "title": book.title,
-                    "author": book.author,
-                    "year": book.year,
-                    "genre": book.genre,
-                    "description": book.description,
-                    "is_available": book.is_available,
-                    "created_at": book.created_at
-                }
-            }
-            result.append(user_data)
+    for user_book, *values in session.exec(statement):
+        user_data = {
+            "id": user_book.id,
+            "book_id": user_book.book_id,
+            "is_read": user_book.is_read,
+            "rating": user_book.rating,
+            "notes": user_book.notes,
+            "added_at": user_book.added_at,
+            "book": dict(zip(book_fields, values))
+        }
+        result.append(user_data)
 
     return result
\ No newline at end of file
@@ -0,0 +1,399 @@
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+from sqlmodel import Session
+from sqlalchemy import select as select_columns
+
+from database import books
+from database.connection import engine
+from models.books import Book
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Optional read-only snapshot of the catalogue for the hot user read paths. Static book
+# columns are stored column by column in a memory-mapped file (one file per catalogue
+# version), so forked workers share the same pages instead of each holding ORM objects.
+# The copy counters change on every checkout and are therefore always read from the
+# database, for the returned page only.
+
+SNAPSHOT_ENABLED = os.environ.get("LIBRARY_CATALOGUE_SNAPSHOT") == "1"
+SNAPSHOT_DIR = os.environ.get("LIBRARY_SNAPSHOT_DIR", "./catalogue")
+
+MAGIC = b"LIBCAT01"
+HEADER = struct.Struct("<8sqq")
+EPOCH = datetime(1970, 1, 1)
+
+# section name -> array typecode; sections without a typecode are raw UTF-8 bytes
+SECTIONS = (
+    ("ids", "q"),
+    ("years", "h"),
+    ("created_at", "q"),
+    ("updated_at", "q"),
+    ("author_codes", "I"),
+    ("genre_codes", "I"),
+    ("title_offsets", "q"),
+    ("titles", None),
+    ("titles_folded", None),
+    ("has_description", "B"),
+    ("description_offsets", "q"),
+    ("descriptions", None),
+    ("author_offsets", "q"),
+    ("authors", None),
+    ("genre_offsets", "q"),
+    ("genres", None),
+)
+SECTION_TABLE = struct.Struct(f"<{2 * len(SECTIONS)}q")
+
+# how many ids go into one IN (...) when reading the copy counters
+COUNTER_BATCH = 500
+# how many rows one short read transaction fetches while building a snapshot
+BUILD_BATCH = 5000
+
+
+class BookRecord:
+    __slots__ = (
+        "id", "title", "author", "year", "genre", "description",
+        "copies_total", "copies_available", "is_available", "created_at", "updated_at"
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    # lets jsonable_encoder turn a record into a dict, there is no __dict__ to fall back on
+    def __iter__(self):
+        for name in self.__slots__:
+            yield name, getattr(self, name)
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _pack_strings(strings: List[str]):
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, blob
+
+
+def build_snapshot(session: Session, path: str, version: int) -> None:
+    ids = array("q")
+    years = array("h")
+    created_at = array("q")
+    updated_at = array("q")
+    author_codes = array("I")
+    genre_codes = array("I")
+    title_offsets = array("q", [0])
+    titles = bytearray()
+    has_description = bytearray()
+    description_offsets = array("q", [0])
+    descriptions = bytearray()
+    authors = {}
+    genres = {}
+
+    statement = select_columns(
+        Book.id, Book.title, Book.author, Book.year, Book.genre,
+        Book.description, Book.created_at, Book.updated_at
+    ).order_by(Book.id).limit(BUILD_BATCH)
+
+    # Keyset-paginated batches, each fetched in full and its transaction closed before
+    # the rows are processed. One streaming cursor would hold SQLite's read lock for
+    # the whole build and stall every checkout, return and admin write meanwhile.
+    last_id = 0
+    while True:
+        batch = session.exec(statement.where(Book.id > last_id)).all()
+        session.commit()
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        for book_id, title, author, year, genre, description, created, updated in batch:
+            ids.append(book_id)
+            years.append(year)
+            created_at.append(_to_micros(created))
+            updated_at.append(_to_micros(updated))
+            author_codes.append(authors.setdefault(author, len(authors)))
+            genre_codes.append(genres.setdefault(genre, len(genres)))
+            titles += title.encode("utf-8")
+            title_offsets.append(len(titles))
+            has_description.append(description is not None)
+            if description:
+                descriptions += description.encode("utf-8")
+            description_offsets.append(len(descriptions))
+
+    author_offsets, author_blob = _pack_strings(list(authors))
+    genre_offsets, genre_blob = _pack_strings(list(genres))
+
+    # bytes.lower() only folds ASCII, which is exactly what SQLite's LIKE does
+    columns = {
+        "ids": ids, "years": years, "created_at": created_at, "updated_at": updated_at,
+        "author_codes": author_codes, "genre_codes": genre_codes,
+        "title_offsets": title_offsets, "titles": titles, "titles_folded": titles.lower(),
+        "has_description": has_description,
+        "description_offsets": description_offsets, "descriptions": descriptions,
+        "author_offsets": author_offsets, "authors": author_blob,
+        "genre_offsets": genre_offsets, "genres": genre_blob,
+    }
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    f = tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False)
+    try:
+        with f:
+            position = HEADER.size + SECTION_TABLE.size
+            table = []
+            for name, _ in SECTIONS:
+                position += -position % 8
+                size = len(columns[name]) * getattr(columns[name], "itemsize", 1)
+                table += [position, size]
+                position += size
+
+            f.write(HEADER.pack(MAGIC, version, len(ids)))
+            f.write(SECTION_TABLE.pack(*table))
+            for name, _ in SECTIONS:
+                f.write(b"\0" * (-f.tell() % 8))
+                f.write(columns[name])
+
+        # readers either see the previous file or the complete new one
+        os.replace(f.name, path)
+    except BaseException:
+        # don't leave a partial file of up to a few hundred MB behind
+        os.unlink(f.name)
+        raise
+
+
+class CatalogueSnapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        magic, self.version, self.count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalogue snapshot")
+
+        table = SECTION_TABLE.unpack_from(view, HEADER.size)
+        self._offsets = {}
+        for index, (name, typecode) in enumerate(SECTIONS):
+            start, size = table[2 * index], table[2 * index + 1]
+            self._offsets[name] = start
+            section = view[start:start + size]
+            setattr(self, name, section.cast(typecode) if typecode else section)
+
+        # the dictionaries are small; decode them once and intern the strings
+        self.author_names = self._decode_dictionary(self.author_offsets, self.authors)
+        self.genre_names = self._decode_dictionary(self.genre_offsets, self.genres)
+
+    @staticmethod
+    def _decode_dictionary(offsets, blob) -> List[str]:
+        return [
+            sys.intern(str(blob[offsets[i]:offsets[i + 1]], "utf-8"))
+            for i in range(len(offsets) - 1)
+        ]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def index_of(self, book_id: int) -> Optional[int]:
+        index = bisect_left(self.ids, book_id)
+        if index < self.count and self.ids[index] == book_id:
+            return index
+        return None
+
+    def record(self, index: int) -> BookRecord:
+        description = None
+        if self.has_description[index]:
+            start, end = self.description_offsets[index], self.description_offsets[index + 1]
+            description = str(self.descriptions[start:end], "utf-8")
+
+        start, end = self.title_offsets[index], self.title_offsets[index + 1]
+
+        return BookRecord(
+            id=self.ids[index],
+            title=str(self.titles[start:end], "utf-8"),
+            author=self.author_names[self.author_codes[index]],
+            year=self.years[index],
+            genre=self.genre_names[self.genre_codes[index]],
+            description=description,
+            created_at=_from_micros(self.created_at[index]),
+            updated_at=_from_micros(self.updated_at[index])
+        )
+
+    def _title_matches(self, needle: bytes) -> List[int]:
+        # search the folded title blob with mmap.find instead of decoding every title
+        base = self._offsets["titles_folded"]
+        end = base + len(self.titles_folded)
+        offsets = self.title_offsets
+
+        result = []
+        position = self._mmap.find(needle, base, end)
+        while position >= 0:
+            relative = position - base
+            index = bisect_right(offsets, relative) - 1
+            if relative + len(needle) <= offsets[index + 1]:
+                result.append(index)
+                position = self._mmap.find(needle, base + offsets[index + 1], end)
+            else:
+                position = self._mmap.find(needle, position + 1, end)
+
+        return result
+
+    def search(self, title: Optional[str] = None, author: Optional[str] = None,
+               genre: Optional[str] = None) -> List[int]:
+        indexes = self._title_matches(title.encode("utf-8").lower()) if title else range(self.count)
+
+        for term, names, codes in (
+            (author, self.author_names, self.author_codes),
+            (genre, self.genre_names, self.genre_codes),
+        ):
+            if term:
+                needle = term.encode("utf-8").lower()
+                matching = {code for code, name in enumerate(names) if needle in name.encode("utf-8").lower()}
+                indexes = [index for index in indexes if codes[index] in matching]
+
+        return list(indexes)
+
+
+_snapshot: Optional[CatalogueSnapshot] = None
+_build_lock = threading.Lock()
+
+
+SNAPSHOT_NAME = re.compile(r"catalogue-(\d+)\.snap")
+
+
+def _snapshot_path(version: int) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"catalogue-{version}.snap")
+
+
+def _remove_stale_snapshots(version: int) -> None:
+    # Only older versions go: a newer file may have just been built by another worker.
+    # Workers still mapping an old file keep a valid mapping after it is unlinked.
+    for name in os.listdir(SNAPSHOT_DIR):
+        match = SNAPSHOT_NAME.fullmatch(name)
+        if match and int(match.group(1)) < version:
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, name))
+            except OSError:
+                pass
+
+
+def _build_current_snapshot() -> None:
+    # Runs in a background thread. The file lock makes sure only one process scans
+    # the catalogue; the others pick the file up once it has been renamed into place.
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(os.path.join(SNAPSHOT_DIR, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return
+
+            with Session(engine) as session:
+                version = books.get_catalogue_version(session)
+                path = _snapshot_path(version)
+                if not os.path.exists(path):
+                    build_snapshot(session, path, version)
+                    _remove_stale_snapshots(version)
+    finally:
+        _build_lock.release()
+
+
+def get_snapshot(session: Session) -> Optional[CatalogueSnapshot]:
+    global _snapshot
+
+    version = books.get_catalogue_version(session)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    try:
+        snapshot = CatalogueSnapshot(_snapshot_path(version))
+    except FileNotFoundError:
+        # not built yet, or already cleaned up by a worker that saw a newer version;
+        # never build on the request path, callers read from the database meanwhile
+        if _build_lock.acquire(blocking=False):
+            threading.Thread(target=_build_current_snapshot, daemon=True).start()
+        return None
+
+    # swapping the reference is atomic; requests holding the old snapshot finish on it
+    _snapshot = snapshot
+    return snapshot
+
+
+def _with_counters(session: Session, snapshot: CatalogueSnapshot, indexes) -> List[BookRecord]:
+    records = [snapshot.record(index) for index in indexes]
+
+    counters = {}
+    for start in range(0, len(records), COUNTER_BATCH):
+        batch = [record.id for record in records[start:start + COUNTER_BATCH]]
+        statement = select_columns(
+            Book.id, Book.copies_total, Book.copies_available, Book.is_available
+        ).where(Book.id.in_(batch))
+        for book_id, *values in session.exec(statement):
+            counters[book_id] = values
+
+    result = []
+    for record in records:
+        # a book deleted after the version check has no counters; leave it out
+        if record.id in counters:
+            record.copies_total, record.copies_available, record.is_available = counters[record.id]
+            result.append(record)
+
+    return result
+
+
+def get_all_books(session: Session, skip: int = 0, limit: int = 100,
+                  fields: Optional[List[str]] = None) -> list:
+    snapshot = get_snapshot(session) if SNAPSHOT_ENABLED and not fields else None
+    if snapshot is None:
+        return books.get_all_books(session, skip, limit, fields)
+
+    start = min(max(skip, 0), len(snapshot))
+    return _with_counters(session, snapshot, range(start, min(start + limit, len(snapshot))))
+
+
+def get_book_by_id(session: Session, book_id: int):
+    snapshot = get_snapshot(session) if SNAPSHOT_ENABLED else None
+    if snapshot is None:
+        return books.get_book_by_id(session, book_id)
+
+    index = snapshot.index_of(book_id)
+    if index is None:
+        return None
+
+    records = _with_counters(session, snapshot, [index])
+    return records[0] if records else None
+
+
+def search_books(session: Session, title: Optional[str] = None,
+                 author: Optional[str] = None, genre: Optional[str] = None,
+                 fields: Optional[List[str]] = None) -> list:
+    # LIKE wildcards in the terms can only be honoured by the database
+    terms = "".join(term for term in (title, author, genre) if term)
+    use_snapshot = SNAPSHOT_ENABLED and not fields and "%" not in terms and "_" not in terms
+    snapshot = get_snapshot(session) if use_snapshot else None
+    if snapshot is None:
+        return books.search_books(session, title, author, genre, fields)
+
+    return _with_counters(session, snapshot, snapshot.search(title, author, genre))
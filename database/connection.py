@@ -1,17 +1,56 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text
 from typing import Generator
 
+from models.books import CatalogueVersion, Hold, Loan
+
 SQLITE_DATABASE_URL = "sqlite:///./library.db"
 
 engine = create_engine(
     SQLITE_DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False, "timeout": 30},
     echo=True
 )
 
 
+def _add_copy_counters():
+    # library.db was created before books had copies; add the counters in place
+    columns = {column["name"] for column in inspect(engine).get_columns("book")}
+    if "copies_available" in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE book ADD COLUMN copies_total INTEGER NOT NULL DEFAULT 1"
+        ))
+        connection.execute(text(
+            "ALTER TABLE book ADD COLUMN copies_available INTEGER NOT NULL DEFAULT 1"
+        ))
+        connection.execute(text(
+            "UPDATE book SET copies_total = CASE WHEN is_available THEN 1 ELSE 0 END, "
+            "copies_available = CASE WHEN is_available THEN 1 ELSE 0 END"
+        ))
+
+
+def _add_lending_indexes():
+    # create_all skips indexes of tables that already exist
+    for table in (Loan.__table__, Hold.__table__):
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _ensure_catalogue_version():
+    with Session(engine) as session:
+        if not session.get(CatalogueVersion, 1):
+            session.add(CatalogueVersion(id=1))
+            session.commit()
+
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    _add_copy_counters()
+    _add_lending_indexes()
+    _ensure_catalogue_version()
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -0,0 +1,260 @@
+from sqlmodel import Session, select
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List
+from datetime import datetime
+
+from database.books import get_book_by_id, get_or_create_user, get_user_by_username
+from models.books import Book, Loan, Hold
+
+
+class LendingError(Exception):
+    pass
+
+
+# Availability lives in the denormalized Book.copies_available counter. Every change
+# to it is a single conditional UPDATE, so concurrent checkouts can never oversell:
+# the database serializes the writes and the WHERE clause rejects the losers. Partial
+# unique indexes (see Loan and Hold) keep one active loan and one pending hold per user.
+
+def _take_copy(session: Session, book_id: int) -> bool:
+    statement = update(Book).where(
+        (Book.id == book_id) &
+        (Book.copies_available > 0)
+    ).values(
+        copies_available=Book.copies_available - 1,
+        is_available=Book.copies_available > 1
+    )
+    return session.exec(statement).rowcount == 1
+
+
+def _release_copy(session: Session, book_id: int) -> None:
+    statement = update(Book).where(Book.id == book_id).values(
+        copies_available=Book.copies_available + 1,
+        is_available=True
+    )
+    session.exec(statement)
+
+
+def _get_active_loan(session: Session, user_id: int, book_id: int) -> Optional[Loan]:
+    statement = select(Loan).where(
+        (Loan.user_id == user_id) &
+        (Loan.book_id == book_id) &
+        (Loan.returned_at == None)
+    )
+    return session.exec(statement).first()
+
+
+def _get_pending_hold(session: Session, user_id: int, book_id: int) -> Optional[Hold]:
+    statement = select(Hold).where(
+        (Hold.user_id == user_id) &
+        (Hold.book_id == book_id) &
+        (Hold.fulfilled_at == None)
+    )
+    return session.exec(statement).first()
+
+
+def _serve_holds(session: Session, book_id: int) -> None:
+    # Hand free copies to the oldest pending holds, inside the caller's transaction.
+    # Callers write first, so the queue is read under the write lock and the copy
+    # goes to the queue before any other request can see it as free.
+    while True:
+        # holders who already have the book on loan wait until they return it
+        has_loan = select(Loan.id).where(
+            (Loan.user_id == Hold.user_id) &
+            (Loan.book_id == Hold.book_id) &
+            (Loan.returned_at == None)
+        ).exists()
+        statement = select(Hold).where(
+            (Hold.book_id == book_id) &
+            (Hold.fulfilled_at == None) &
+            ~has_loan
+        ).order_by(Hold.id)
+        hold = session.exec(statement).first()
+
+        if not hold or not _take_copy(session, book_id):
+            return
+
+        session.exec(
+            update(Hold).where(Hold.id == hold.id).values(fulfilled_at=datetime.utcnow())
+        )
+        session.add(Loan(user_id=hold.user_id, book_id=book_id))
+        session.flush()
+
+
+def checkout_book(session: Session, username: str, book_id: int) -> Optional[Loan]:
+    book = get_book_by_id(session, book_id)
+    if not book:
+        return None
+
+    user = get_or_create_user(session, username)
+
+    if _get_active_loan(session, user.id, book_id):
+        raise LendingError(f"Книга с ID {book_id} уже выдана вам")
+
+    if not _take_copy(session, book_id):
+        session.rollback()
+        raise LendingError(f"Нет свободных экземпляров книги с ID {book_id}, оформите бронь")
+
+    # the copy is reserved, so these reads run under the write lock: a walk-in only
+    # gets a copy that is not owed to someone already waiting in the hold queue
+    waiting = session.exec(
+        select(func.count(Hold.id)).where(
+            (Hold.book_id == book_id) &
+            (Hold.fulfilled_at == None) &
+            (Hold.user_id != user.id)
+        )
+    ).one()
+    still_free = session.exec(select(Book.copies_available).where(Book.id == book_id)).one()
+
+    if waiting > still_free:
+        session.rollback()
+        raise LendingError(f"Все свободные экземпляры книги с ID {book_id} забронированы, оформите бронь")
+
+    loan = Loan(user_id=user.id, book_id=book_id)
+
+    session.add(loan)
+    try:
+        session.commit()
+    except IntegrityError:
+        # a concurrent checkout by the same user won; the rollback also frees the copy
+        session.rollback()
+        raise LendingError(f"Книга с ID {book_id} уже выдана вам")
+    session.refresh(loan)
+
+    return loan
+
+
+def return_book(session: Session, username: str, book_id: int) -> Optional[Loan]:
+    user = get_user_by_username(session, username)
+    if not user:
+        return None
+
+    loan = _get_active_loan(session, user.id, book_id)
+    if not loan:
+        return None
+
+    returned = session.exec(
+        update(Loan).where(
+            (Loan.id == loan.id) &
+            (Loan.returned_at == None)
+        ).values(returned_at=datetime.utcnow())
+    ).rowcount
+
+    if not returned:
+        session.rollback()
+        return None
+
+    _release_copy(session, book_id)
+    _serve_holds(session, book_id)
+    session.commit()
+
+    session.refresh(loan)
+
+    return loan
+
+
+def place_hold(session: Session, username: str, book_id: int) -> Optional[Hold]:
+    book = get_book_by_id(session, book_id)
+    if not book:
+        return None
+
+    user = get_or_create_user(session, username)
+
+    if _get_active_loan(session, user.id, book_id):
+        raise LendingError(f"Книга с ID {book_id} уже выдана вам")
+
+    existing = _get_pending_hold(session, user.id, book_id)
+    if existing:
+        return existing
+
+    hold = Hold(user_id=user.id, book_id=book_id)
+
+    session.add(hold)
+    try:
+        session.flush()
+    except IntegrityError:
+        session.rollback()
+        raise LendingError(f"Книга с ID {book_id} уже забронирована вами")
+
+    # a copy may already be free: serve the queue in the same transaction
+    _serve_holds(session, book_id)
+    session.commit()
+
+    session.refresh(hold)
+
+    return hold
+
+
+def cancel_hold(session: Session, username: str, book_id: int) -> bool:
+    user = get_user_by_username(session, username)
+    if not user:
+        return False
+
+    hold = _get_pending_hold(session, user.id, book_id)
+    if not hold:
+        return False
+
+    # the hold may have been served in the meantime; then there is nothing to cancel
+    cancelled = session.exec(
+        delete(Hold).where(
+            (Hold.id == hold.id) &
+            (Hold.fulfilled_at == None)
+        )
+    ).rowcount
+    session.commit()
+
+    return cancelled == 1
+
+
+def resize_book_copies(session: Session, book_id: int, copies_total: int) -> Optional[Book]:
+    delta = copies_total - Book.copies_total
+
+    statement = update(Book).where(
+        (Book.id == book_id) &
+        (Book.copies_available + delta >= 0)
+    ).values(
+        copies_total=copies_total,
+        copies_available=Book.copies_available + delta,
+        is_available=Book.copies_available + delta > 0
+    )
+
+    if not session.exec(statement).rowcount:
+        session.rollback()
+        if not get_book_by_id(session, book_id):
+            return None
+        raise LendingError(
+            f"Нельзя уменьшить число экземпляров книги с ID {book_id} ниже числа выданных"
+        )
+
+    _serve_holds(session, book_id)
+    session.commit()
+
+    book = get_book_by_id(session, book_id)
+    session.refresh(book)
+
+    return book
+
+
+def get_user_loans(session: Session, username: str, active_only: bool = False) -> List[Loan]:
+    user = get_user_by_username(session, username)
+    if not user:
+        return []
+
+    statement = select(Loan).where(Loan.user_id == user.id)
+    if active_only:
+        statement = statement.where(Loan.returned_at == None)
+
+    return session.exec(statement.order_by(Loan.id)).all()
+
+
+def get_user_holds(session: Session, username: str) -> List[Hold]:
+    user = get_user_by_username(session, username)
+    if not user:
+        return []
+
+    statement = select(Hold).where(
+        (Hold.user_id == user.id) &
+        (Hold.fulfilled_at == None)
+    ).order_by(Hold.id)
+    return session.exec(statement).all()
\ No newline at end of file
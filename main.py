@@ -5,6 +5,7 @@ import uuid
 from database.connection import engine, create_db_and_tables
 from database.books import create_book, get_or_create_user
 from models.books import Book, BookCreate, User, UserBook
+from middleware.compression import CompressionMiddleware
 from routes.admin import router as admin_router
 from routes.user import router as user_router
 
@@ -87,6 +88,8 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 app.include_router(admin_router)
 app.include_router(user_router)
 
@@ -103,7 +106,7 @@ async def root():
         "database": "SQLite (library.db)",
         "endpoints": {
             "admin": {
-                "GET /admin/books": "Получить все книги",
+                "GET /admin/books": "Получить все книги (параметр fields=id,title,... — только нужные поля)",
                 "GET /admin/books/{id}": "Получить книгу по ID",
                 "POST /admin/books": "Создать новую книгу",
                 "PUT /admin/books/{id}": "Обновить книгу",
@@ -111,14 +114,20 @@ async def root():
                 "GET /admin/books/search/": "Поиск книг"
             },
             "user": {
-                "GET /user/books": "Просмотреть книги",
+                "GET /user/books": "Просмотреть книги (параметр fields=id,title,... — только нужные поля)",
                 "GET /user/books/{id}": "Детали книги",
                 "GET /user/search/": "Поиск книг",
                 "GET /user/library": "Личная библиотека (параметр: username)",
                 "POST /user/library": "Добавить в библиотеку (тело: book_id, username)",
                 "PATCH /user/library/{book_id}/read": "Отметить прочитанной (параметр: username)",
                 "PATCH /user/library/{book_id}/unread": "Отметить непрочитанной",
-                "DELETE /user/library/{book_id}": "Удалить из библиотеки"
+                "DELETE /user/library/{book_id}": "Удалить из библиотеки",
+                "POST /user/books/{id}/checkout": "Взять книгу (параметр: username)",
+                "POST /user/books/{id}/return": "Вернуть книгу (параметр: username)",
+                "POST /user/books/{id}/hold": "Забронировать книгу (очередь FIFO)",
+                "DELETE /user/books/{id}/hold": "Отменить бронь",
+                "GET /user/loans": "Выданные книги (параметр: username)",
+                "GET /user/holds": "Активные брони (параметр: username)"
             }
         },
         "test_user": {
@@ -0,0 +1,110 @@
+import gzip
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6)
+}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=4)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda data: zstandard.ZstdCompressor(level=3).compress(data)
+
+# used to break ties when the client weights several encodings equally
+PREFERENCE = ("zstd", "br", "gzip")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        weight = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in PREFERENCE:
+        if encoding not in ENCODERS:
+            continue
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+
+    return best
+
+
+# Compresses complete response bodies of at least minimum_size bytes with the best
+# encoding the client accepts; streamed responses are passed through as is.
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        streaming = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, streaming
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            if streaming or message.get("more_body", False):
+                if not streaming:
+                    streaming = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if len(body) >= self.minimum_size and "content-encoding" not in headers:
+                body = ENCODERS[encoding](body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
\ No newline at end of file
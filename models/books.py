@@ -2,6 +2,7 @@ from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from datetime import datetime
 from pydantic import validator
+from sqlalchemy import Index, text
 
 
 class BookBase(SQLModel):
@@ -10,16 +11,23 @@ class BookBase(SQLModel):
     year: int = Field(..., ge=1000, le=2025)
     genre: str = Field(..., min_length=1, max_length=50)
     description: Optional[str] = Field(None, max_length=1000)
-    is_available: bool = Field(default=True)
+    copies_total: int = Field(default=1, ge=0)
 
 
 class Book(BookBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    copies_available: int = Field(default=1, ge=0)
+    is_available: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     user_books: List["UserBook"] = Relationship(back_populates="book")
 
+class CatalogueVersion(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=0)
+
+
 class BookCreate(BookBase):
     pass
 
@@ -30,11 +38,13 @@ class BookUpdate(SQLModel):
     year: Optional[int] = Field(None, ge=1000, le=2025)
     genre: Optional[str] = Field(None, min_length=1, max_length=50)
     description: Optional[str] = Field(None, max_length=1000)
-    is_available: Optional[bool] = None
+    copies_total: Optional[int] = Field(None, ge=0)
 
 
 class BookResponse(BookBase):
     id: int
+    copies_available: int
+    is_available: bool
     created_at: datetime
 
 class UserBase(SQLModel):
@@ -84,4 +94,48 @@ class UserBookResponse(UserBookBase):
 
 
 class UserBookDetail(UserBookResponse):
-    user: User
\ No newline at end of file
+    user: User
+
+
+class LoanBase(SQLModel):
+    user_id: int = Field(foreign_key="user.id", index=True)
+    book_id: int = Field(foreign_key="book.id", index=True)
+
+
+class Loan(LoanBase, table=True):
+    # at most one active loan per user and book
+    __table_args__ = (
+        Index("ix_loan_active", "user_id", "book_id", unique=True, sqlite_where=text("returned_at IS NULL")),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    borrowed_at: datetime = Field(default_factory=datetime.utcnow)
+    returned_at: Optional[datetime] = None
+
+
+class LoanResponse(LoanBase):
+    id: int
+    borrowed_at: datetime
+    returned_at: Optional[datetime]
+
+
+class HoldBase(SQLModel):
+    user_id: int = Field(foreign_key="user.id", index=True)
+    book_id: int = Field(foreign_key="book.id", index=True)
+
+
+class Hold(HoldBase, table=True):
+    # at most one pending hold per user and book
+    __table_args__ = (
+        Index("ix_hold_pending", "user_id", "book_id", unique=True, sqlite_where=text("fulfilled_at IS NULL")),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    fulfilled_at: Optional[datetime] = None
+
+
+class HoldResponse(HoldBase):
+    id: int
+    created_at: datetime
+    fulfilled_at: Optional[datetime]
\ No newline at end of file
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
 from database.connection import get_session
+from routes.fields import get_book_fields
 from database.books import (
-    create_book, get_all_books, get_book_by_id,
+    BookInUseError, create_book, get_all_books, get_book_by_id,
     update_book, delete_book, search_books
 )
+from database.lending import LendingError, resize_book_copies
 from models.books import BookCreate, BookUpdate, BookResponse
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -16,8 +20,11 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 def get_all_books_admin(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[List[str]] = Depends(get_book_fields),
     session: Session = Depends(get_session)
 ):
+    if fields:
+        return JSONResponse(jsonable_encoder(get_all_books(session, skip, limit, fields)))
     return get_all_books(session, skip, limit)
 
 
@@ -49,6 +56,20 @@ def update_book_admin(
     book_update: BookUpdate,
     session: Session = Depends(get_session)
 ):
+    if book_update.copies_total is not None:
+        try:
+            book = resize_book_copies(session, book_id, book_update.copies_total)
+        except LendingError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
+        if not book:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Книга с ID {book_id} не найдена"
+            )
+
     book = update_book(session, book_id, book_update)
     if not book:
         raise HTTPException(
@@ -63,7 +84,14 @@ def delete_book_admin(
     book_id: int,
     session: Session = Depends(get_session)
 ):
-    success = delete_book(session, book_id)
+    try:
+        success = delete_book(session, book_id)
+    except BookInUseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,6 +104,7 @@ def search_books_admin(
     title: str = None,
     author: str = None,
     genre: str = None,
+    fields: Optional[List[str]] = Depends(get_book_fields),
     session: Session = Depends(get_session)
 ):
-    return search_books(session, title, author, genre)
\ No newline at end of file
+    return search_books(session, title, author, genre, fields)
\ No newline at end of file
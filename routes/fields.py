@@ -0,0 +1,14 @@
+from fastapi import HTTPException, status
+from typing import Optional, List
+
+from database.books import parse_book_fields
+
+
+def get_book_fields(fields: Optional[str] = None) -> Optional[List[str]]:
+    try:
+        return parse_book_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля книги: {e}"
+        )
\ No newline at end of file
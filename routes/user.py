@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
 from database.connection import get_session
+from routes.fields import get_book_fields
+from database.catalogue import get_all_books, get_book_by_id, search_books
 from database.books import (
-    get_all_books, get_book_by_id, search_books,
     add_book_to_user_library, get_user_library_with_details,
     get_user_book, update_user_book, remove_book_from_user_library,
     get_user_read_books, get_user_unread_books
 )
-from models.books import BookResponse, UserBookCreate, UserBookUpdate
+from database.lending import (
+    LendingError, checkout_book, return_book, place_hold, cancel_hold,
+    get_user_loans, get_user_holds
+)
+from models.books import BookResponse, UserBookCreate, UserBookUpdate, LoanResponse, HoldResponse
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -18,8 +25,11 @@ router = APIRouter(prefix="/user", tags=["user"])
 def get_all_books_user(
         skip: int = 0,
         limit: int = 100,
+        fields: Optional[List[str]] = Depends(get_book_fields),
         session: Session = Depends(get_session)
 ):
+    if fields:
+        return JSONResponse(jsonable_encoder(get_all_books(session, skip, limit, fields)))
     return get_all_books(session, skip, limit)
 
 
@@ -42,17 +52,19 @@ def search_books_user(
         title: str = None,
         author: str = None,
         genre: str = None,
+        fields: Optional[List[str]] = Depends(get_book_fields),
         session: Session = Depends(get_session)
 ):
-    return search_books(session, title, author, genre)
+    return search_books(session, title, author, genre, fields)
 
 
 @router.get("/library")
 def get_my_library(
         username: str,
+        fields: Optional[List[str]] = Depends(get_book_fields),
         session: Session = Depends(get_session)
 ):
-    return get_user_library_with_details(session, username)
+    return get_user_library_with_details(session, username, fields)
 
 
 @router.post("/library")
@@ -136,4 +148,99 @@ def get_my_unread_books(
         username: str,
         session: Session = Depends(get_session)
 ):
-    return get_user_unread_books(session, username)
\ No newline at end of file
+    return get_user_unread_books(session, username)
+
+
+@router.post("/books/{book_id}/checkout", response_model=LoanResponse)
+def checkout_book_user(
+        book_id: int,
+        username: str,
+        session: Session = Depends(get_session)
+):
+    try:
+        loan = checkout_book(session, username, book_id)
+    except LendingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+    if not loan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Книга с ID {book_id} не найдена"
+        )
+
+    return loan
+
+
+@router.post("/books/{book_id}/return", response_model=LoanResponse)
+def return_book_user(
+        book_id: int,
+        username: str,
+        session: Session = Depends(get_session)
+):
+    loan = return_book(session, username, book_id)
+    if not loan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Книга с ID {book_id} не выдана вам"
+        )
+
+    return loan
+
+
+@router.post("/books/{book_id}/hold", response_model=HoldResponse)
+def place_hold_user(
+        book_id: int,
+        username: str,
+        session: Session = Depends(get_session)
+):
+    try:
+        hold = place_hold(session, username, book_id)
+    except LendingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+    if not hold:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Книга с ID {book_id} не найдена"
+        )
+
+    return hold
+
+
+@router.delete("/books/{book_id}/hold")
+def cancel_hold_user(
+        book_id: int,
+        username: str,
+        session: Session = Depends(get_session)
+):
+    success = cancel_hold(session, username, book_id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Бронь на книгу с ID {book_id} не найдена"
+        )
+
+    return {"message": "Бронь отменена"}
+
+
+@router.get("/loans", response_model=List[LoanResponse])
+def get_my_loans(
+        username: str,
+        active_only: bool = False,
+        session: Session = Depends(get_session)
+):
+    return get_user_loans(session, username, active_only)
+
+
+@router.get("/holds", response_model=List[HoldResponse])
+def get_my_holds(
+        username: str,
+        session: Session = Depends(get_session)
+):
+    return get_user_holds(session, username)
\ No newline at end of file
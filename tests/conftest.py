@@ -0,0 +1,18 @@
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from models.books import CatalogueVersion
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'library.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60}
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(CatalogueVersion(id=1))
+        session.commit()
+    yield engine
+    engine.dispose()
\ No newline at end of file
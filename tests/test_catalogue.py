@@ -0,0 +1,155 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+from sqlmodel import Session, create_engine
+
+from database import books, catalogue
+from database.lending import checkout_book
+from models.books import Book, BookCreate, BookUpdate
+
+
+@pytest.fixture
+def snapshot_engine(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalogue, "engine", engine)
+    monkeypatch.setattr(catalogue, "SNAPSHOT_DIR", str(tmp_path / "catalogue"))
+    monkeypatch.setattr(catalogue, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(catalogue, "_snapshot", None)
+
+    with Session(engine) as session:
+        for i in range(30):
+            books.create_book(session, BookCreate(
+                title=f"Книга {i} Volume {i % 4}",
+                author=f"Автор {i % 5}",
+                year=1900 + i,
+                genre=f"Жанр {i % 3}",
+                description=f"Описание {i}" if i % 2 else None,
+                copies_total=2
+            ))
+
+    return engine
+
+
+def _wait_for_build():
+    with catalogue._build_lock:
+        pass
+
+
+def _rows(records):
+    return [dict(record) if isinstance(record, catalogue.BookRecord) else record.model_dump() for record in records]
+
+
+def test_first_read_falls_back_while_snapshot_builds(snapshot_engine):
+    with Session(snapshot_engine) as session:
+        assert catalogue.get_snapshot(session) is None
+        assert len(catalogue.get_all_books(session)) == 30
+
+        _wait_for_build()
+
+        snapshot = catalogue.get_snapshot(session)
+        assert snapshot is not None
+        assert snapshot.version == books.get_catalogue_version(session)
+
+
+def test_snapshot_reads_match_database(snapshot_engine):
+    with Session(snapshot_engine) as session:
+        catalogue.get_snapshot(session)
+        _wait_for_build()
+
+        def expected(records):
+            return [{k: v for k, v in row.items() if k in catalogue.BookRecord.__slots__} for row in _rows(records)]
+
+        assert _rows(catalogue.get_all_books(session, 5, 10)) == expected(books.get_all_books(session, 5, 10))
+        assert _rows([catalogue.get_book_by_id(session, 7)]) == expected([books.get_book_by_id(session, 7)])
+        assert catalogue.get_book_by_id(session, 999) is None
+
+        for terms in ({"title": "volume 1"}, {"author": "Автор 2", "genre": "Жанр 1"}, {"title": "zz"}):
+            assert _rows(catalogue.search_books(session, **terms)) == expected(books.search_books(session, **terms))
+
+
+def test_only_catalogue_changes_bump_the_version(snapshot_engine):
+    with Session(snapshot_engine) as session:
+        version = books.get_catalogue_version(session)
+
+        books.update_book(session, 1, BookUpdate(copies_total=5))
+        books.update_book(session, 1, BookUpdate(title=books.get_book_by_id(session, 1).title))
+        assert books.get_catalogue_version(session) == version
+
+        books.update_book(session, 1, BookUpdate(title="Новое название"))
+        assert books.get_catalogue_version(session) == version + 1
+
+
+def test_cleanup_keeps_newer_snapshots(snapshot_engine):
+    with Session(snapshot_engine) as session:
+        catalogue.get_snapshot(session)
+        _wait_for_build()
+        version = books.get_catalogue_version(session)
+
+    directory = catalogue.SNAPSHOT_DIR
+    for stale in (version - 1, version + 1):
+        open(catalogue._snapshot_path(stale), "wb").close()
+
+    catalogue._remove_stale_snapshots(version)
+
+    assert sorted(os.listdir(directory)) == sorted([
+        ".lock", f"catalogue-{version}.snap", f"catalogue-{version + 1}.snap"
+    ])
+
+
+def test_missing_snapshot_file_triggers_rebuild(snapshot_engine):
+    with Session(snapshot_engine) as session:
+        catalogue.get_snapshot(session)
+        _wait_for_build()
+        version = books.get_catalogue_version(session)
+        os.remove(catalogue._snapshot_path(version))
+
+        assert catalogue.get_snapshot(session) is None
+        _wait_for_build()
+        assert catalogue.get_snapshot(session).version == version
+
+
+def test_failed_build_leaves_no_temporary_file(snapshot_engine, monkeypatch):
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(catalogue.os, "replace", fail)
+
+    with Session(snapshot_engine) as session:
+        with pytest.raises(OSError):
+            catalogue.build_snapshot(session, catalogue._snapshot_path(1), 1)
+
+    assert os.listdir(catalogue.SNAPSHOT_DIR) == []
+
+
+def test_checkout_commits_while_snapshot_builds(snapshot_engine, monkeypatch):
+    # enough rows that the build cannot read the whole table in one go
+    now = datetime.utcnow()
+    with snapshot_engine.begin() as connection:
+        connection.execute(insert(Book.__table__), [
+            {"title": f"Том {i}", "author": "Автор", "year": 2000, "genre": "Жанр",
+             "copies_total": 1, "copies_available": 1, "is_available": True,
+             "created_at": now, "updated_at": now}
+            for i in range(12000)
+        ])
+
+    # a writer that gives up after one second instead of waiting for the build
+    writer = create_engine(snapshot_engine.url, connect_args={"timeout": 1})
+    loans = []
+    to_micros = catalogue._to_micros
+
+    def checkout_during_build(value):
+        if not loans:
+            with Session(writer) as session:
+                loans.append(checkout_book(session, "reader", 30))
+        return to_micros(value)
+
+    monkeypatch.setattr(catalogue, "_to_micros", checkout_during_build)
+
+    with Session(snapshot_engine) as session:
+        catalogue.build_snapshot(session, catalogue._snapshot_path(1), 1)
+
+    writer.dispose()
+
+    assert loans[0] is not None
+    assert len(catalogue.CatalogueSnapshot(catalogue._snapshot_path(1))) == 12030
\ No newline at end of file
@@ -0,0 +1,99 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware import compression
+from middleware.compression import CompressionMiddleware, choose_encoding
+
+BODY = "War and Peace " * 200
+
+
+def _identity(data):
+    return data
+
+
+@pytest.fixture
+def all_encoders(monkeypatch):
+    monkeypatch.setattr(compression, "ENCODERS", {"gzip": _identity, "br": _identity, "zstd": _identity})
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "ENCODERS", {"gzip": _identity})
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br, zstd", "zstd"),
+    ("gzip;q=0.5, br;q=0.9", "br"),
+    ("zstd;q=0.1, gzip", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0.5, zstd;q=0", "br"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding_follows_q_values(all_encoders, accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("br, zstd", None),
+    ("br, zstd, gzip;q=0.1", "gzip"),
+    ("*", "gzip"),
+])
+def test_choose_encoding_skips_unavailable_encoders(gzip_only, accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/text/{size}")
+    def text(size: int):
+        return PlainTextResponse(BODY[:size])
+
+    @app.get("/precompressed")
+    def precompressed():
+        return Response(gzip.compress(BODY.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BODY.encode()] * 3), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/text/1000", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY[:1000]
+
+
+def test_large_responses_are_compressed(client):
+    response = client.get("/text/2000", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 2000
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.text == BODY[:2000]
+
+
+def test_existing_content_encoding_is_left_untouched(client):
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+
+def test_streamed_responses_pass_through(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY * 3
\ No newline at end of file
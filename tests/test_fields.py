@@ -0,0 +1,90 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from database.books import create_book, get_or_create_user, parse_book_fields
+from database.connection import get_session
+from models.books import BookCreate, UserBook
+from routes.admin import router as admin_router
+from routes.user import router as user_router
+
+
+@pytest.fixture
+def client(engine):
+    with Session(engine) as session:
+        for i in range(3):
+            create_book(session, BookCreate(
+                title=f"Книга {i}",
+                author="Лев Толстой",
+                year=1869,
+                genre="Роман",
+                description="Длинное описание " * 20
+            ))
+        user = get_or_create_user(session, "reader")
+        session.add(UserBook(user_id=user.id, book_id=2, is_read=True))
+        session.commit()
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(admin_router)
+    app.include_router(user_router)
+    app.dependency_overrides[get_session] = get_test_session
+
+    return TestClient(app)
+
+
+def test_parse_book_fields():
+    assert parse_book_fields(None) is None
+    assert parse_book_fields(" , ") is None
+    assert parse_book_fields("id, title,id") == ["id", "title"]
+    with pytest.raises(ValueError):
+        parse_book_fields("id,password")
+
+
+def test_books_return_only_requested_fields(client):
+    response = client.get("/user/books", params={"fields": "id,title,author"})
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": i, "title": f"Книга {i - 1}", "author": "Лев Толстой"} for i in (1, 2, 3)
+    ]
+
+
+def test_books_without_fields_return_full_books(client):
+    book = client.get("/user/books").json()[0]
+
+    assert book["description"].startswith("Длинное описание")
+    assert book["copies_available"] == 1
+
+
+def test_search_returns_only_requested_fields(client):
+    response = client.get("/admin/books/search/", params={"title": "Книга 2", "fields": "title"})
+
+    assert response.json() == [{"title": "Книга 2"}]
+
+
+def test_library_embeds_only_requested_book_fields(client):
+    response = client.get("/user/library", params={"username": "reader", "fields": "id,title"})
+
+    assert response.status_code == 200
+    entry, = response.json()
+    assert entry["book_id"] == 2
+    assert entry["is_read"] is True
+    assert entry["book"] == {"id": 2, "title": "Книга 1"}
+
+
+@pytest.mark.parametrize("url, params", [
+    ("/user/books", {}),
+    ("/admin/books", {}),
+    ("/user/search/", {"title": "Книга"}),
+    ("/user/library", {"username": "reader"}),
+])
+def test_unknown_field_is_rejected(client, url, params):
+    response = client.get(url, params={**params, "fields": "id,password"})
+
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
\ No newline at end of file
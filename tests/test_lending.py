@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+from sqlmodel import Session, select
+
+from database import lending
+from database.books import BookInUseError, create_book, delete_book, get_book_by_id, get_or_create_user
+from database.lending import (
+    LendingError, cancel_hold, checkout_book, get_user_loans, place_hold, return_book
+)
+from models.books import Book, BookCreate, Hold
+
+
+def _create_book(session: Session, copies_total: int = 1):
+    return create_book(session, BookCreate(
+        title="Мастер и Маргарита",
+        author="Михаил Булгаков",
+        year=1967,
+        genre="Роман",
+        copies_total=copies_total
+    ))
+
+
+def test_delete_refused_while_book_is_on_loan(engine):
+    with Session(engine) as session:
+        book_id = _create_book(session).id
+        checkout_book(session, "reader", book_id)
+
+        with pytest.raises(BookInUseError):
+            delete_book(session, book_id)
+        assert get_book_by_id(session, book_id) is not None
+
+        return_book(session, "reader", book_id)
+        assert delete_book(session, book_id) is True
+
+
+def test_delete_refused_while_hold_is_pending(engine):
+    with Session(engine) as session:
+        book_id = _create_book(session, copies_total=0).id
+        place_hold(session, "reader", book_id)
+
+        with pytest.raises(BookInUseError):
+            delete_book(session, book_id)
+        assert get_book_by_id(session, book_id) is not None
+
+
+def test_returned_copy_goes_to_the_hold_queue_before_walk_ins(engine, monkeypatch):
+    with Session(engine) as session:
+        book_id = _create_book(session).id
+        checkout_book(session, "borrower", book_id)
+        place_hold(session, "waiting", book_id)
+
+    walk_in = []
+
+    def checkout_walk_in():
+        with Session(engine) as session:
+            try:
+                walk_in.append(checkout_book(session, "walk_in", book_id))
+            except LendingError as e:
+                walk_in.append(e)
+
+    serve_holds = lending._serve_holds
+    thread = threading.Thread(target=checkout_walk_in)
+
+    def serve_holds_with_walk_in(session, served_book_id):
+        # the copy is back on the shelf: let a walk-in try to grab it right now
+        thread.start()
+        time.sleep(0.3)
+        serve_holds(session, served_book_id)
+
+    monkeypatch.setattr(lending, "_serve_holds", serve_holds_with_walk_in)
+
+    with Session(engine) as session:
+        return_book(session, "borrower", book_id)
+    thread.join()
+
+    with Session(engine) as session:
+        assert isinstance(walk_in[0], LendingError)
+        assert [loan.returned_at for loan in get_user_loans(session, "waiting")] == [None]
+        assert session.exec(select(Book.copies_available).where(Book.id == book_id)).one() == 0
+
+
+def test_walk_in_refused_while_free_copies_are_owed_to_holds(engine):
+    with Session(engine) as session:
+        book_id = _create_book(session, copies_total=2).id
+        # a hold that has not been served yet, as if its turn were still being processed
+        session.add(Hold(user_id=get_or_create_user(session, "waiting").id, book_id=book_id))
+        session.commit()
+
+        # one of the two free copies is owed to the queue, the other is not
+        assert checkout_book(session, "walk_in", book_id) is not None
+        with pytest.raises(LendingError):
+            checkout_book(session, "another", book_id)
+        assert session.exec(select(Book.copies_available).where(Book.id == book_id)).one() == 1
+
+
+def test_cancel_does_not_remove_a_hold_served_meanwhile(engine, monkeypatch):
+    with Session(engine) as session:
+        book_id = _create_book(session).id
+        checkout_book(session, "borrower", book_id)
+        place_hold(session, "waiting", book_id)
+
+    get_pending_hold = lending._get_pending_hold
+
+    def serve_before_cancel(session, user_id, served_book_id):
+        hold = get_pending_hold(session, user_id, served_book_id)
+        # the copy comes back between reading the hold and deleting it
+        with Session(engine) as other:
+            return_book(other, "borrower", served_book_id)
+        return hold
+
+    monkeypatch.setattr(lending, "_get_pending_hold", serve_before_cancel)
+
+    with Session(engine) as session:
+        assert cancel_hold(session, "waiting", book_id) is False
+        assert len(get_user_loans(session, "waiting", active_only=True)) == 1
+        assert session.exec(select(Hold).where(Hold.book_id == book_id)).one().fulfilled_at is not None
\ No newline at end of file
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, select
+
+from database.books import create_book
+from database.lending import LendingError, checkout_book
+from models.books import Book, BookCreate, Loan
+
+COPIES = 50
+CHECKOUTS = 300
+
+
+def test_concurrent_checkouts_never_oversell(engine):
+    with Session(engine) as session:
+        book = create_book(session, BookCreate(
+            title="Война и мир",
+            author="Лев Толстой",
+            year=1869,
+            genre="Роман-эпопея",
+            copies_total=COPIES
+        ))
+        book_id = book.id
+
+    def checkout(i):
+        with Session(engine) as session:
+            try:
+                return checkout_book(session, f"reader_{i}", book_id) is not None
+            except LendingError:
+                return False
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(checkout, range(CHECKOUTS)))
+
+    with Session(engine) as session:
+        loans = session.exec(select(Loan).where(Loan.book_id == book_id)).all()
+        book = session.get(Book, book_id)
+
+        assert sum(results) == COPIES
+        assert len(loans) == COPIES
+        assert len({loan.user_id for loan in loans}) == COPIES
+        assert book.copies_available == 0
+        assert book.is_available is False
+
+
+def test_concurrent_checkouts_by_one_user_give_one_loan(engine):
+    with Session(engine) as session:
+        book = create_book(session, BookCreate(
+            title="1984",
+            author="Джордж Оруэлл",
+            year=1949,
+            genre="Антиутопия",
+            copies_total=20
+        ))
+        book_id = book.id
+
+    def checkout(_):
+        with Session(engine) as session:
+            try:
+                return checkout_book(session, "reader", book_id) is not None
+            except LendingError:
+                return False
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(checkout, range(40)))
+
+    with Session(engine) as session:
+        loans = session.exec(select(Loan).where(Loan.book_id == book_id)).all()
+        book = session.get(Book, book_id)
+
+        assert sum(results) == 1
+        assert len(loans) == 1
+        assert book.copies_available == 19
\ No newline at end of file